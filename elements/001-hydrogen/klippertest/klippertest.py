@@ -2,149 +2,299 @@
 
 import json
 import asyncio
+import concurrent.futures
+import functools
+import mmap
 import os
 import re
 import logging
 import psutil
 import time
+from collections import deque
+
+# orjson parses/serializes a few times faster than stdlib json, which
+# matters most in the subscribe loop; fall back to json when unavailable
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# The two JSON-RPC request bodies are constants, so frame and encode them once
+_LIST_REQ = (_json_dumps({
+    "jsonrpc": "2.0",
+    "method": "objects/list",
+    "id": 123
+}) + "\x03").encode()
+
+_SUBSCRIBE_REQ = (_json_dumps({
+    "jsonrpc": "2.0",
+    "method": "objects/subscribe",
+    "params": {
+        "objects": {
+            "toolhead": ["position"]
+        }
+    },
+    "id": 456
+}) + "\x03").encode()
+
+# Single combined key/value pattern covering key=val, key: "val" and key: val,
+# compiled once so each config file is scanned in a single pass. The quoted
+# alternative comes before the bare colon one so JSON-style values win.
+# Bytes mode so it can run directly over an mmap'd file without decoding it.
+_RE_ANY = re.compile(rb'(\w+)\s*(?:=\s*(.+?)|:\s*"([^"]+)"|:\s*(.+?))\s*(?=\n|$)')
+
+# Substring tags used to classify a process from its cmdline; insertion
+# order preserves the old if/elif precedence (klippy.py first)
+_TAGS = {
+    'klippy.py': 'klipper',
+    'moonraker': 'moonraker',
+    'fluidd': 'fluidd',
+    'mainsail': 'mainsail',
+    'crowsnest': 'crowsnest',
+    'timelapse': 'timelapse',
+}
+
+_TAGS_BYTES = {tag.encode(): name for tag, name in _TAGS.items()}
+
+# Parsed-config cache keyed by path -> (mtime, data); unchanged files cost
+# a single stat() on later runs instead of a read and regex pass
+_CFG_CACHE = {}
+
+@functools.lru_cache(maxsize=256)
+def _exists(path):
+    # Config probes hit the same paths repeatedly; memoize the stat calls.
+    # Cleared at the top of get_printer_status so each run sees fresh state.
+    return os.path.exists(path)
+
+def _classify_cmdline(cmdline_args):
+    # Cheap path: for most tags the executable basename is the tag itself
+    if cmdline_args:
+        name = _TAGS.get(os.path.basename(cmdline_args[0]))
+        if name:
+            return name
+    # Token scan fallback, keeping tag precedence and skipping the
+    # ' '.join allocation the old full-cmdline search needed
+    for tag, name in _TAGS.items():
+        if any(tag in arg for arg in cmdline_args):
+            return name
+    return None
+
+def _classify_raw(raw):
+    # Cheap path on the first NUL-separated token's basename
+    argv0 = raw.split(b'\x00', 1)[0]
+    name = _TAGS_BYTES.get(os.path.basename(argv0))
+    if name:
+        return name
+    # bytes-in-bytes search runs on the raw cmdline without decoding it;
+    # the NUL separators do not affect substring tags. Catches interpreter
+    # invocations like ".../python .../klippy.py printer.cfg"
+    for tag, name in _TAGS_BYTES.items():
+        if tag in raw:
+            return name
+    return None
+
+def _klipper_configs(cmdline_args, config_files):
+    for arg in cmdline_args:
+        if arg.endswith('.cfg'):
+            config_files.append(arg)
+            config_dir = os.path.dirname(arg)
+            moonraker_conf = os.path.join(config_dir, 'moonraker.conf')
+            mainsail_conf = os.path.join(config_dir, 'mainsail.conf')
+            if _exists(moonraker_conf):
+                config_files.append(moonraker_conf)
+            if _exists(mainsail_conf):
+                config_files.append(mainsail_conf)
+
+def _moonraker_configs(cmdline_args, config_files):
+    for arg in cmdline_args:
+        if arg.startswith('-d'):
+            config_dir = arg[2:].strip()
+            moonraker_conf = os.path.join(config_dir, 'moonraker.conf')
+            if _exists(moonraker_conf):
+                config_files.append(moonraker_conf)
+
+def _crowsnest_configs(cmdline_args, config_files):
+    for arg in cmdline_args:
+        if arg.endswith('.conf'):
+            config_files.append(arg)
+
+# Per-tag config-file scanners; tags without an entry contribute no configs
+_CONFIG_HANDLERS = {
+    'klipper': _klipper_configs,
+    'moonraker': _moonraker_configs,
+    'crowsnest': _crowsnest_configs,
+}
+
+def _collect_config_files(name, cmdline_args, config_files):
+    handler = _CONFIG_HANDLERS.get(name)
+    if handler:
+        handler(cmdline_args, config_files)
+
 def find_processes_and_config_files():
     processes = []
     config_files = []
-    for proc in psutil.process_iter(['name', 'cmdline', 'pid']):
-        cmdline = ' '.join(proc.info['cmdline'])
-        if 'klippy.py' in cmdline:
-            processes.append(('klipper', proc.info['pid'], proc))
-            for arg in proc.info['cmdline']:
-                if arg.endswith('.cfg'):
-                    config_files.append(arg)
-                    config_dir = os.path.dirname(arg)
-                    moonraker_conf = os.path.join(config_dir, 'moonraker.conf')
-                    mainsail_conf = os.path.join(config_dir, 'mainsail.conf')
-                    if os.path.exists(moonraker_conf):
-                        config_files.append(moonraker_conf)
-                    if os.path.exists(mainsail_conf):
-                        config_files.append(mainsail_conf)
-        elif 'moonraker' in cmdline:
-            processes.append(('moonraker', proc.info['pid'], proc))
-            for arg in proc.info['cmdline']:
-                if arg.startswith('-d'):
-                    config_dir = arg[2:].strip()
-                    moonraker_conf = os.path.join(config_dir, 'moonraker.conf')
-                    if os.path.exists(moonraker_conf):
-                        config_files.append(moonraker_conf)
-        elif 'fluidd' in cmdline:
-            processes.append(('fluidd', proc.info['pid'], proc))
-        elif 'mainsail' in cmdline:
-            processes.append(('mainsail', proc.info['pid'], proc))
-        elif 'crowsnest' in cmdline:
-            processes.append(('crowsnest', proc.info['pid'], proc))
-            for arg in proc.info['cmdline']:
-                if arg.endswith('.conf'):
-                    config_files.append(arg)
-        elif 'timelapse' in cmdline:
-            processes.append(('timelapse', proc.info['pid'], proc))
+    if os.path.exists('/proc'):
+        # Fast path: enumerate /proc ourselves and read each cmdline file
+        # directly, skipping psutil entirely for the scan. Process objects
+        # are only built for the handful of matches we keep.
+        for pid_name in os.listdir('/proc'):
+            if not pid_name.isdigit():
+                continue
+            pid = int(pid_name)
+            try:
+                with open(f'/proc/{pid_name}/cmdline', 'rb') as f:
+                    raw = f.read()
+            except OSError:
+                continue
+            name = _classify_raw(raw)
+            if name:
+                # Decode only the matched process's argv, for config scanning
+                cmdline_args = [arg.decode() for arg in raw.split(b'\x00') if arg]
+                processes.append((name, pid, cmdline_args))
+                _collect_config_files(name, cmdline_args, config_files)
+    else:
+        for proc in psutil.process_iter(['name', 'cmdline', 'pid']):
+            cmdline_args = proc.info['cmdline'] or []
+            name = _classify_cmdline(cmdline_args)
+            if name:
+                processes.append((name, proc.info['pid'], cmdline_args))
+                _collect_config_files(name, cmdline_args, config_files)
 
     return processes, config_files
 
+def _map_config(config_file):
+    # The mapping stays valid after the descriptor is closed
+    with open(config_file, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped (and have nothing to parse)
+            return None
+
+def _parse_config(mm):
+    data = {}
+    if mm is None:
+        return data
+    with mm:
+        # The regex scans the page cache in place; only the matched
+        # keys and values are ever decoded
+        content = memoryview(mm)
+        try:
+            for match in _RE_ANY.finditer(content):
+                key = match.group(1).decode()
+                value = match.group(2) or match.group(3) or match.group(4)
+                data[key] = value.strip().decode()
+        finally:
+            content.release()
+    return data
+
 def parse_config_files(config_files):
     klipper_uds = None
     moonraker_port = None
     klipper_api_key = None
     moonraker_api_key = None
-    config_data = {}
 
-    for config_file in config_files:
-        config_data[config_file] = {}
-        with open(config_file, 'r') as f:
-            content = f.read()
-
-            key_value_pairs = re.findall(r'(\w+)\s*=\s*(.+?)\s*(?=\n|$)', content)
-            for key, value in key_value_pairs:
-                config_data[config_file][key] = value.strip()
-
-            key_value_pairs = re.findall(r'(\w+)\s*:\s*(.+?)\s*(?=\n|$)', content)
-            for key, value in key_value_pairs:
-                config_data[config_file][key] = value.strip()
-
-            json_style_pairs = re.findall(r'(\w+)\s*:\s*"(.+?)"\s*(?=\n|$)', content)
-            for key, value in json_style_pairs:
-                config_data[config_file][key] = value
-
-    for config_file, data in config_data.items():
-        if 'klippy_uds_address' in data:
-            klipper_uds = data['klippy_uds_address']
-            logging.debug(f"Found Klipper Unix Domain Socket address in {config_file}: {klipper_uds}")
-
-        if 'unix_socket_path' in data:
-            klipper_uds = data['unix_socket_path']
-            logging.debug(f"Found Unix Domain Socket path in {config_file}: {klipper_uds}")
-        elif 'socket_path' in data:
-            klipper_uds = data['socket_path']
-            logging.debug(f"Found Unix Domain Socket path in {config_file}: {klipper_uds}")
-
-        if 'api_key' in data:
-            if config_file.endswith('printer.cfg'):
-                klipper_api_key = data['api_key']
-                logging.debug(f"Found Klipper API key in {config_file}")
-            elif config_file.endswith('moonraker.conf'):
-                moonraker_api_key = data['api_key']
-                logging.debug(f"Found Moonraker API key in {config_file}")
-
-        if 'port' in data:
-            moonraker_port = data['port']
-            logging.debug(f"Found Moonraker port in {config_file}: {moonraker_port}")
-        elif 'moonraker_port' in data:
-            moonraker_port = data['moonraker_port']
-            logging.debug(f"Found Moonraker port in {config_file}: {moonraker_port}")
-
-        for key, value in data.items():
-            if key.endswith('_config') and value.endswith('.conf'):
-                if os.path.exists(value):
-                    config_files.append(value)
-                    logging.debug(f"Found additional config file in {config_file}: {value}")
+    # BFS worklist: each config is parsed exactly once, and configs
+    # referenced via *_config keys are queued as they are discovered.
+    # Each wave of files is mapped on a thread pool so the blocking I/O
+    # overlaps, then the in-memory contents are parsed serially.
+    seen = set(config_files)
+    worklist = deque(config_files)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        while worklist:
+            wave = list(worklist)
+            worklist.clear()
+
+            # Re-parse only the files whose mtime changed since last run
+            stale = []
+            for config_file in wave:
+                mtime = os.stat(config_file).st_mtime
+                cached = _CFG_CACHE.get(config_file)
+                if cached is None or cached[0] != mtime:
+                    stale.append((config_file, mtime))
+            mappings = executor.map(_map_config, [path for path, _ in stale])
+            for (config_file, mtime), mm in zip(stale, mappings):
+                _CFG_CACHE[config_file] = (mtime, _parse_config(mm))
+
+            for config_file in wave:
+                data = _CFG_CACHE[config_file][1]
+
+                for key, value in data.items():
+                    if key.endswith('_config') and value.endswith('.conf'):
+                        if value not in seen and _exists(value):
+                            seen.add(value)
+                            worklist.append(value)
+                            logging.debug("Found additional config file in %s: %s", config_file, value)
+
+                if 'klippy_uds_address' in data:
+                    klipper_uds = data['klippy_uds_address']
+                    logging.debug("Found Klipper Unix Domain Socket address in %s: %s", config_file, klipper_uds)
+
+                if 'unix_socket_path' in data:
+                    klipper_uds = data['unix_socket_path']
+                    logging.debug("Found Unix Domain Socket path in %s: %s", config_file, klipper_uds)
+                elif 'socket_path' in data:
+                    klipper_uds = data['socket_path']
+                    logging.debug("Found Unix Domain Socket path in %s: %s", config_file, klipper_uds)
+
+                if 'api_key' in data:
+                    if config_file.endswith('printer.cfg'):
+                        klipper_api_key = data['api_key']
+                        logging.debug("Found Klipper API key in %s", config_file)
+                    elif config_file.endswith('moonraker.conf'):
+                        moonraker_api_key = data['api_key']
+                        logging.debug("Found Moonraker API key in %s", config_file)
+
+                if 'port' in data:
+                    moonraker_port = data['port']
+                    logging.debug("Found Moonraker port in %s: %s", config_file, moonraker_port)
+                elif 'moonraker_port' in data:
+                    moonraker_port = data['moonraker_port']
+                    logging.debug("Found Moonraker port in %s: %s", config_file, moonraker_port)
+
+                # Stop scanning once every target value has been found
+                if klipper_uds and moonraker_port and klipper_api_key and moonraker_api_key:
+                    worklist.clear()
+                    break
 
     return klipper_uds, moonraker_port, klipper_api_key, moonraker_api_key
 
 async def receive_response(reader):
-    response_data = b''
-    while True:
-        try:
-            chunk = await reader.read(4096)
-            # logging.debug(f"Received chunk: {chunk}")
-            if not chunk:
-                break
-            response_data += chunk
-            # Check if the message is complete by looking for the framing character
-            if b'\x03' in response_data:
-                break
-        except Exception as e:
-            logging.error(f"Error while receiving response: {e}")
-            break
-    # Split the data on the framing character and take the first part as the complete message
-    response_string = response_data.split(b'\x03')[0].decode()
-    # logging.debug(f"Full response string: {response_string}")
-    return response_string
-
-async def send_request(writer, request):
-    writer.write(request.encode())
-    await writer.drain()
-    # logging.debug(f"Sent request: {request}")
-
+    # The StreamReader buffers and frames the message internally; one await
+    # per message, no manual chunk concatenation
+    try:
+        data = await reader.readuntil(b'\x03')
+    except asyncio.IncompleteReadError as e:
+        # Connection closed before a framing character arrived
+        return e.partial.decode()
+    except Exception as e:
+        logging.error("Error while receiving response: %s", e)
+        return ''
+    return data[:-1].decode()
 
 async def get_printer_status():
     start_time = time.time()
+    _exists.cache_clear()
     processes, config_files = find_processes_and_config_files()
-    logging.debug("Found processes:")
-    for process_name, pid, process in processes:
-        logging.debug(f"- {process_name} (PID: {pid}): {' '.join(process.info['cmdline'])}")
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Found processes:")
+        for process_name, pid, cmdline_args in processes:
+            logging.debug("- %s (PID: %d): %s", process_name, pid, ' '.join(cmdline_args))
 
     logging.debug("\nFound config files:")
     for config_file in config_files:
-        logging.debug(f"- {config_file}")
+        logging.debug("- %s", config_file)
 
     klipper_uds, moonraker_port, klipper_api_key, moonraker_api_key = parse_config_files(config_files)
 
@@ -157,22 +307,23 @@ async def get_printer_status():
 
     for attempt in range(max_attempts):
         try:
-            logging.debug(f"Attempting to connect to Unix Domain Socket: {klipper_uds} (Attempt {attempt + 1}/{max_attempts})")
-            reader, writer = await asyncio.open_unix_connection(klipper_uds)
+            logging.debug("Attempting to connect to Unix Domain Socket: %s (Attempt %d/%d)", klipper_uds, attempt + 1, max_attempts)
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(klipper_uds), timeout=2.0)
             logging.debug("Connected to Unix Domain Socket")
 
-            list_request = json.dumps({
-                "jsonrpc": "2.0",
-                "method": "objects/list",
-                "id": 123
-            }) + "\x03"
-            await send_request(writer, list_request)
+            # Pipeline both requests back-to-back with a single drain;
+            # the responses come back in order on the same stream
+            writer.write(_LIST_REQ)
+            writer.write(_SUBSCRIBE_REQ)
+            await writer.drain()
+            logging.debug("Sent objects/list and objects/subscribe requests")
 
             response = await receive_response(reader)
-            logging.debug(f"Received response: {response}")
+            logging.debug("Received response: %s", response)
             if response:
-                data = json.loads(response)
-                logging.debug(f"Parsed response: {data}")
+                data = _json_loads(response)
+                logging.debug("Parsed response: %s", data)
 
                 if "result" in data:
                     logging.debug("API request succeeded")
@@ -184,27 +335,14 @@ async def get_printer_status():
                     end_time = time.time()
                     print(f"Time taken to get initial response: {end_time - start_time:.6f} seconds")
 
-                    # Subscribe to printer objects
-                    subscribe_request = json.dumps({
-                        "jsonrpc": "2.0",
-                        "method": "objects/subscribe",
-                        "params": {
-                            "objects": {
-                                "toolhead": ["position"]
-                            }
-                        },
-                        "id": 456
-                    }) + "\x03"
-
-                    await send_request(writer, subscribe_request)
-                    logging.debug("Sent JSON-RPC request to subscribe to printer objects")
-
+                    # The subscribe reply is the first message read below; it
+                    # carries "result" rather than "params" and is skipped
                     while True:
                         try:
                             update = await receive_response(reader)
                             if update:
-                                # logging.debug(f"Received update: {update}")
-                                update_data = json.loads(update)
+                                # logging.debug("Received update: %s", update)
+                                update_data = _json_loads(update)
                                 if "params" in update_data:
                                     # print("\nPrinter Status Update:")
                                     print_printer_status(update_data["params"]["status"])
@@ -214,17 +352,17 @@ async def get_printer_status():
                             print("\nStopped listening for updates.")
                             break
                         except Exception as e:
-                            logging.error(f"Error while receiving updates: {e}")
+                            logging.error("Error while receiving updates: %s", e)
                             break
                 else:
-                    logging.error(f"Error in objects/list: {data.get('error', 'Unknown error')}")
+                    logging.error("Error in objects/list: %s", data.get('error', 'Unknown error'))
             else:
                 logging.error("No response received")
 
         except (json.JSONDecodeError, KeyError) as e:
-            logging.error(f"Error: Unable to parse response: {e}")
+            logging.error("Error: Unable to parse response: %s", e)
         except Exception as e:
-            logging.error(f"Error: {e}")
+            logging.error("Error: %s", e)
 
         await asyncio.sleep(delay)
 